@@ -1,5 +1,13 @@
 import streamlit as st
 import os
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
 # Local Speech-to-Text function
@@ -7,27 +15,93 @@ from modules.speech_to_text import transcribe_with_diarization_local
 # Translator utility
 from modules.translator_utils import translate_transcription_segments
 # DOCX export function
-from modules.docx_export import export_transcription_to_docx
+from modules.docx_export import export_transcription_to_docx_bytes
 # Analysis function using Azure OpenAI or Phi4
-from modules.openai_analysis import analyze_transcription
+from modules.openai_analysis import analyze_transcription, get_analysis_batch_result
 # Text cleaning function (via OpenAI or Phi4)
 from modules.text_cleaning import clean_segments_with_openai
 
+# Segment text areas rendered per page in the Review & Edit tab.
+SEGMENTS_PER_PAGE = 50
+# Bounds for the in-memory result caches: translation is keyed by the full segment
+# JSON, so every edit adds an entry; cap the count and expire stale ones.
+RESULT_CACHE_MAX_ENTRIES = 32
+RESULT_CACHE_TTL_S = 6 * 60 * 60
+
+# Cached wrappers: reruns triggered by unrelated widgets reuse previous results
+# instead of repeating container/API round-trips. st.cache_data does not cache
+# exceptions, so empty or incomplete results are raised instead of returned and
+# clicking the button again retries the work.
+# Cleaning is not wrapped: clean_segments_with_openai keeps its own cache, which
+# only stores segments that were actually cleaned.
+def _segments_key(segments):
+    return json.dumps(segments, sort_keys=True, ensure_ascii=False)
+
+@st.cache_data(show_spinner=False, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL_S)
+def _cached_transcribe(file_hash, _path, language):
+    # _path is excluded from the cache key so renamed uploads still hit.
+    segments = transcribe_with_diarization_local(_path, language=language)
+    if not segments:
+        raise RuntimeError("No speech was recognized. Check the speech container logs and try again.")
+    return segments
+
+@st.cache_data(show_spinner=False, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL_S)
+def _cached_translate(segments_json, target_language, source_language):
+    segments = translate_transcription_segments(
+        json.loads(segments_json),
+        target_language=target_language,
+        source_language=source_language
+    )
+    missing = sum(1 for seg in segments if seg.get("text", "").strip() and not seg.get("translated_text"))
+    if missing:
+        raise RuntimeError(f"The translator returned no text for {missing} segment(s). Please try again.")
+    return segments
+
+# DOCX generation is CPU-bound; it runs in worker processes so the UI stays responsive.
+# Workers are spawned rather than forked: forking the multi-threaded Streamlit server
+# can deadlock the child.
+@st.cache_resource
+def _docx_pool():
+    return ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+# A pool whose worker died stays broken; drop it so the next request builds a new one.
+def _reset_docx_pool():
+    _docx_pool().shutdown(wait=False, cancel_futures=True)
+    _docx_pool.clear()
+
+# Store segments together with the values derived from them, so reruns read the
+# derived values instead of rescanning every segment.
+def update_transcription_results(segments):
+    st.session_state.transcription_results = segments
+    st.session_state._joined_transcript = "\n".join(seg.get("text", "") for seg in segments)
+    st.session_state._speaker_set = {seg.get("speaker_id", "Unknown") for seg in segments}
+
 # Clear session state for new upload
 def clear_previous_session():
     keys_to_clear = [
         "temp_file_path",
         "transcription_results",
+        "_joined_transcript",
+        "_speaker_set",
         "uploaded_filename",
+        "uploaded_file_hash",
         "analysis_result",
+        "analysis_batch_id",
         "cleaned_transcription",
-        "translated_transcription"
+        "translated_transcription",
+        "docx_future",
+        "docx_filename"
     ]
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
 
+# Each tab is a fragment so widget interactions only rerun the tab they belong to.
+# Cross-tab values live in st.session_state; a full rerun is requested whenever
+# a change has to show up in the other tabs.
+
 # Tab 1: Upload & Transcribe
+@st.fragment
 def upload_and_transcribe():
     st.header("1. Upload & Transcribe")
     uploaded_file = st.file_uploader("Upload an audio file (MP3/WAV)", type=["mp3", "wav"], key="upload")
@@ -37,9 +111,13 @@ def upload_and_transcribe():
             st.session_state.uploaded_filename = uploaded_file.name
         if not st.session_state.get("temp_file_path"):
             temp_file_path = f"temp_{uploaded_file.name}"
-            with open(temp_file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # Stream to disk in 1 MiB chunks instead of writing one full-size copy.
+            uploaded_file.seek(0)
+            with open(temp_file_path, "wb", buffering=1024 * 1024) as f:
+                shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
             st.session_state.temp_file_path = temp_file_path
+            st.session_state.uploaded_file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+            st.rerun()
         st.success(f"File '{uploaded_file.name}' uploaded successfully!")
         language_options = ["ro-RO", "en-US", "ru-RU", "zh-CN", "ar-AE"]
         language_selected = st.selectbox("Select transcription language:", language_options, index=0)
@@ -49,14 +127,18 @@ def upload_and_transcribe():
                 return
             with st.spinner("Transcribing using local container..."):
                 try:
-                    transcription_results = transcribe_with_diarization_local(
+                    transcription_results = _cached_transcribe(
+                        st.session_state.uploaded_file_hash,
                         st.session_state.temp_file_path,
-                        language=language_selected
+                        language_selected
                     )
-                    st.session_state.transcription_results = transcription_results
-                    st.success("Transcription completed!")
+                    update_transcription_results(transcription_results)
                 except Exception as e:
                     st.error(f"Transcription failed: {e}")
+                    return
+            st.rerun()
+        if st.session_state.get("transcription_results"):
+            st.success("Transcription completed!")
     else:
         st.info("Please upload an audio file.")
 
@@ -70,16 +152,34 @@ def review_and_edit():
     if not st.session_state.get("transcription_results"):
         st.warning("No transcription results available. Please complete transcription first.")
         return
+    _edit_segments_form()
+    _assign_speaker_names_form()
+
+@st.fragment
+def _edit_segments_form():
     st.subheader("Edit Transcription Segments")
+    segments = st.session_state.transcription_results
+    # Only one page of text areas is rendered per rerun; edits are merged on submit.
+    search = st.text_input("Jump to segments containing:", key="segment_search")
+    if search:
+        needle = search.lower()
+        indices = [i for i, seg in enumerate(segments) if needle in seg.get("text", "").lower()]
+    else:
+        indices = range(len(segments))
+    page_count = max(1, math.ceil(len(indices) / SEGMENTS_PER_PAGE))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+    page_indices = indices[(page - 1) * SEGMENTS_PER_PAGE:page * SEGMENTS_PER_PAGE]
     with st.form("edit_transcription_form"):
-        edited_transcriptions = []
-        for i, segment in enumerate(st.session_state.transcription_results):
+        page_edits = {}
+        for i in page_indices:
+            segment = segments[i]
             speaker = segment.get("speaker_id", "Unknown")
             text = segment.get("text", "")
             new_text = st.text_area(label=f"Segment {i+1} - Speaker {speaker}",
                                     value=text,
                                     key=f"segment_{i}")
-            edited_transcriptions.append({**segment, "text": new_text})
+            if new_text != text:
+                page_edits[i] = new_text
         # Select cleaning engine: gpt4o or phi4
         cleaning_engine = st.selectbox("Select Text Cleaning Engine:", options=["gpt4o", "phi4"], index=0)
         col1, col2 = st.columns(2)
@@ -87,22 +187,31 @@ def review_and_edit():
             save_edits = st.form_submit_button("Save Edits")
         with col2:
             clean_segments = st.form_submit_button("Clean All Segments")
+        if save_edits or clean_segments:
+            edited_transcriptions = list(segments)
+            for i, new_text in page_edits.items():
+                edited_transcriptions[i] = {**segments[i], "text": new_text}
         if save_edits:
-            st.session_state.transcription_results = edited_transcriptions
+            update_transcription_results(edited_transcriptions)
             st.success("Transcription edits saved!")
         if clean_segments:
             try:
-                cleaned_transcriptions = clean_segments_with_openai(edited_transcriptions, engine=cleaning_engine)
-                st.session_state.transcription_results = cleaned_transcriptions
-                st.session_state.cleaned_transcription = "\n".join([seg["text"] for seg in cleaned_transcriptions])
+                # Cleaning works in place; copy so a failed run leaves the stored segments untouched.
+                cleaned_transcriptions = clean_segments_with_openai(
+                    [dict(seg) for seg in edited_transcriptions], engine=cleaning_engine
+                )
+                update_transcription_results(cleaned_transcriptions)
+                st.session_state.cleaned_transcription = st.session_state._joined_transcript
                 st.success("All segments cleaned!")
             except Exception as e:
                 st.error(f"Text cleaning failed: {e}")
+
+@st.fragment
+def _assign_speaker_names_form():
     st.subheader("Assign Speaker Names")
     with st.form("assign_names_form"):
         speaker_names = {}
-        unique_speakers = {seg.get("speaker_id", "Unknown") for seg in st.session_state.transcription_results}
-        for speaker in unique_speakers:
+        for speaker in st.session_state._speaker_set:
             name = st.text_input(label=f"Name for Speaker {speaker}",
                                  value=f"Speaker {speaker}",
                                  key=f"name_{speaker}")
@@ -113,6 +222,7 @@ def review_and_edit():
             st.success("Speaker names saved!")
 
 # Tab 3: Translate Transcript
+@st.fragment
 def translate_transcript():
     st.header("3. Translate Transcript")
     if not st.session_state.get("transcription_results"):
@@ -126,16 +236,16 @@ def translate_transcript():
             with st.spinner("Translating via local translator container..."):
                 try:
                     used_source = None if source_language.lower() in ["auto", "auto-detect"] else source_language
-                    translated_segments = translate_transcription_segments(
-                        segments,
-                        target_language=target_language,
-                        source_language=used_source
-                    )
-                    translated_text = "\n\n".join([
-                        f"Speaker {seg.get('speaker_name', seg.get('speaker_id', 'Unknown'))}: {seg.get('translated_text', '')}"
-                        for seg in translated_segments
-                    ])
-                    st.session_state.translated_transcription = translated_text
+                    translated_segments = _cached_translate(_segments_key(segments), target_language, used_source)
+                    buf = io.StringIO()
+                    for i, seg in enumerate(translated_segments):
+                        if i:
+                            buf.write("\n\n")
+                        buf.write("Speaker ")
+                        buf.write(str(seg.get("speaker_name") or seg.get("speaker_id") or "Unknown"))
+                        buf.write(": ")
+                        buf.write(seg.get("translated_text", ""))
+                    st.session_state.translated_transcription = buf.getvalue()
                     st.success("Translation completed!")
                 except Exception as e:
                     st.error(f"Translation failed: {e}")
@@ -144,22 +254,61 @@ def translate_transcript():
         st.text_area("Translated Transcript", st.session_state.translated_transcription, height=300)
 
 # Tab 4: Analysis
+@st.fragment
 def analysis_tab():
     st.header("4. Analysis")
     if not st.session_state.get("transcription_results"):
         st.warning("No transcription available for analysis. Please complete transcription and editing first.")
         return
-    transcription_text = "\n".join([seg.get("text", "") for seg in st.session_state.transcription_results])
+    transcription_text = st.session_state._joined_transcript
     # Select analysis engine: gpt4o or phi4
     analysis_engine = st.selectbox("Select Analysis Engine:", options=["gpt4o", "phi4"], index=0)
+    use_batch = st.checkbox(
+        "Queue with the Azure OpenAI Batch API (gpt4o only; lower cost, results within 24h)",
+        key="analysis_use_batch",
+        disabled=analysis_engine != "gpt4o"
+    )
     if st.button("Analyze Transcription", key="analyze_button"):
         with st.spinner("Analyzing transcription..."):
             try:
-                analysis_result = analyze_transcription(transcription_text, engine=analysis_engine)
-                st.session_state.analysis_result = analysis_result
-                st.success("Analysis completed!")
+                if use_batch and analysis_engine == "gpt4o":
+                    st.session_state.analysis_batch_id = analyze_transcription(
+                        transcription_text, engine=analysis_engine, async_batch=True
+                    )
+                else:
+                    # Stream tokens into a placeholder as they arrive; repeated prompts
+                    # are served from the on-disk cache in analyze_transcription.
+                    placeholder = st.empty()
+                    streamed = []
+
+                    def show_delta(delta):
+                        streamed.append(delta)
+                        placeholder.markdown("".join(streamed))
+
+                    analysis_result = analyze_transcription(
+                        transcription_text, engine=analysis_engine, on_delta=show_delta
+                    )
+                    placeholder.empty()
+                    st.session_state.analysis_result = analysis_result
+                    st.success("Analysis completed!")
             except Exception as e:
                 st.error(f"Analysis failed: {e}")
+    # Pending batch jobs are polled whenever this tab reruns.
+    if st.session_state.get("analysis_batch_id"):
+        batch_id = st.session_state.analysis_batch_id
+        try:
+            batch_result = get_analysis_batch_result(batch_id)
+        except Exception as e:
+            st.error(f"Batch analysis failed: {e}")
+            st.session_state.analysis_batch_id = None
+        else:
+            if batch_result is None:
+                st.info(f"Batch analysis '{batch_id}' is queued. Results will appear here once it completes.")
+                st.button("Check Batch Status", key="check_batch_button")
+            else:
+                st.session_state.analysis_result = batch_result
+                st.session_state.analysis_batch_id = None
+                st.success("Batch analysis completed!")
     if st.session_state.get("analysis_result"):
         st.subheader("Analysis Output")
         st.text_area("Analysis", st.session_state.analysis_result, height=300)
@@ -177,24 +326,44 @@ def export_and_save():
     analysis_text = st.session_state.get("analysis_result")
     final_transcription = st.session_state.transcription_results
     if st.button("Generate DOCX and Download", key="download_button"):
-        with st.spinner("Generating DOCX..."):
+        unique_suffix = datetime.now().strftime("%Y%m%d%H%M%S")
+        st.session_state.docx_filename = f"transcription_{unique_suffix}.docx"
+        try:
+            st.session_state.docx_future = _docx_pool().submit(
+                export_transcription_to_docx_bytes,
+                final_transcription,
+                analysis_text=analysis_text,
+                translated_transcription=st.session_state.get("translated_transcription"),
+                cleaned_transcription=st.session_state.get("cleaned_transcription")
+            )
+        except BrokenProcessPool:
+            _reset_docx_pool()
+            st.session_state.docx_future = None
+            st.error("Error generating DOCX: a worker process crashed. Please try again.")
+    docx_future = st.session_state.get("docx_future")
+    if docx_future is not None:
+        if docx_future.done():
             try:
-                unique_suffix = datetime.now().strftime("%Y%m%d%H%M%S")
-                output_filename = f"transcription_{unique_suffix}.docx"
-                docx_file = export_transcription_to_docx(
-                    final_transcription,
-                    analysis_text=analysis_text,
-                    translated_transcription=st.session_state.get("translated_transcription"),
-                    cleaned_transcription=st.session_state.get("cleaned_transcription"),
-                    output_filename=output_filename
-                )
-                with open(docx_file, "rb") as f:
-                    st.download_button("Download DOCX", data=f.read(), file_name=docx_file)
+                st.download_button("Download DOCX", data=docx_future.result(), file_name=st.session_state.docx_filename)
                 st.success("DOCX generated!")
+            except BrokenProcessPool:
+                _reset_docx_pool()
+                st.session_state.docx_future = None
+                st.error("Error generating DOCX: a worker process crashed. Please try again.")
             except Exception as e:
                 st.error(f"Error generating DOCX: {e}")
+        else:
+            _docx_progress()
     st.markdown("**Note:** In production, implement cleanup for temporary files.")
 
+# Polls the background DOCX build; a full rerun swaps in the download button once it is done.
+@st.fragment(run_every=1)
+def _docx_progress():
+    docx_future = st.session_state.get("docx_future")
+    if docx_future is None or docx_future.done():
+        st.rerun()
+    st.info("Generating DOCX in the background. You can keep working in the other tabs.")
+
 # Main App with Tabs
 def main():
     st.title("Azure AI Local Speech Transcription & Translation Demo")
@@ -223,11 +392,17 @@ def main():
 if __name__ == "__main__":
     for key in [
         "transcription_results",
+        "_joined_transcript",
+        "_speaker_set",
         "temp_file_path",
         "uploaded_filename",
+        "uploaded_file_hash",
         "analysis_result",
+        "analysis_batch_id",
         "cleaned_transcription",
-        "translated_transcription"
+        "translated_transcription",
+        "docx_future",
+        "docx_filename"
     ]:
         if key not in st.session_state:
             st.session_state[key] = None
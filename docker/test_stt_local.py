@@ -1,29 +1,38 @@
-import time
+import threading
+from functools import lru_cache
 import azure.cognitiveservices.speech as speechsdk
 
-def test_stt_local():
+@lru_cache(maxsize=None)
+def _speech_config(host: str, language: str) -> speechsdk.SpeechConfig:
+    """
+    Builds the SpeechConfig once per (host, language) and reuses it for every file.
+    """
+    # Point to your local container endpoint (mapped from port 5000).
+    speech_config = speechsdk.SpeechConfig(host=host)
+    speech_config.speech_recognition_language = language
+    return speech_config
+
+def transcribe_file(path: str, host: str, language: str):
     """
     Continuously transcribe an audio file with a local STT container.
     Prints recognized text or cancellation details.
     """
 
-    # 1. Point to your local container endpoint (mapped from port 5000).
-    speech_config = speechsdk.SpeechConfig(host="ws://localhost:5103")
-    
-    # 2. Set the recognition language to Romanian (adjust as needed).
-    speech_config.speech_recognition_language = "ro-RO"
+    # 1-2. Reuse the SpeechConfig for this container and language.
+    speech_config = _speech_config(host, language)
 
     # 3. Configure the audio file to transcribe.
-    audio_config = speechsdk.audio.AudioConfig(filename="stenograma.wav")
+    audio_config = speechsdk.audio.AudioConfig(filename=path)
 
     # 4. Create a standard SpeechRecognizer for continuous recognition.
+    # A recognizer is bound to its AudioConfig, so a new one is needed per file.
     speech_recognizer = speechsdk.SpeechRecognizer(
         speech_config=speech_config,
         audio_config=audio_config
     )
 
-    # 5. A simple flag to know when we're done.
-    done = False
+    # 5. An event set by the callbacks once we're done.
+    done_event = threading.Event()
 
     # --- EVENT CALLBACKS ---
 
@@ -49,8 +58,7 @@ def test_stt_local():
             details = result.cancellation_details
             print(f"  Reason: {details.reason}")
             print(f"  Error Details: {details.error_details}")
-        nonlocal done
-        done = True
+        done_event.set()
 
     # Session started: the recognition session (not the first utterance).
     def session_started_cb(evt: speechsdk.SessionEventArgs):
@@ -59,8 +67,7 @@ def test_stt_local():
     # Session stopped: no more recognition results, or an error triggered stop.
     def session_stopped_cb(evt: speechsdk.SessionEventArgs):
         print(f"[SESSION STOPPED] {evt.session_id}")
-        nonlocal done
-        done = True
+        done_event.set()
 
     # --- CONNECT EVENT HANDLERS ---
     speech_recognizer.recognizing.connect(recognizing_cb)
@@ -73,12 +80,17 @@ def test_stt_local():
     speech_recognizer.start_continuous_recognition_async().get()
     print("Continuous recognition started...\n")
 
-    # 7. Keep the script running until recognition is done or canceled.
-    while not done:
-        time.sleep(0.5)
+    # 7. Block until recognition is done or canceled.
+    done_event.wait()
 
     # 8. Stop recognition after completion/timeout/error.
     speech_recognizer.stop_continuous_recognition_async().get()
 
+def test_stt_local():
+    """
+    Transcribe the sample file with the local Romanian STT container.
+    """
+    transcribe_file("stenograma.wav", host="ws://localhost:5103", language="ro-RO")
+
 if __name__ == "__main__":
     test_stt_local()
@@ -1,31 +1,135 @@
-from pydub import AudioSegment
+import hashlib
+import os
+import subprocess
+import tempfile
+import wave
+from functools import lru_cache
+
+from modules.cache_utils import get_cache_dir
+
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+TARGET_SAMPLE_WIDTH = 2  # bytes (16-bit PCM)
+# Read size used while hashing the source to name its converted WAV in the cache.
+FINGERPRINT_CHUNK_BYTES = 1024 * 1024
+
+
+def _is_stt_ready(file_path: str) -> bool:
+    """
+    True if the file is already a 16kHz, mono, 16-bit PCM WAV, whatever its extension.
+    Only the header is read, in-process; anything the wave module cannot parse is not ready.
+    """
+    try:
+        with wave.open(file_path, "rb") as wf:
+            return (
+                wf.getcomptype() == "NONE"
+                and wf.getframerate() == TARGET_SAMPLE_RATE
+                and wf.getnchannels() == TARGET_CHANNELS
+                and wf.getsampwidth() == TARGET_SAMPLE_WIDTH
+            )
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def _fingerprint(file_path: str) -> str:
+    """Content key: SHA-256 of the whole file, read in FINGERPRINT_CHUNK_BYTES blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(FINGERPRINT_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _run_ffmpeg(file_path: str, wav_file_path: str) -> None:
+    # 16kHz sample rate, mono channel, 16-bit PCM.
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-i", file_path,
+                "-ac", str(TARGET_CHANNELS),
+                "-ar", str(TARGET_SAMPLE_RATE),
+                "-sample_fmt", "s16",
+                "-f", "wav",
+                wav_file_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        stderr = (exc.stderr or b"").decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed to convert '{file_path}': {stderr}") from exc
+    except OSError as exc:
+        raise RuntimeError(
+            f"ffmpeg is required to convert '{file_path}' but could not be run "
+            f"(is it installed and on PATH?): {exc}"
+        ) from exc
+
+
+@lru_cache(maxsize=32)
+def _convert_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    # mtime_ns and size are only part of the cache key: a rewritten file is converted again.
+    if _is_stt_ready(file_path):
+        return file_path
+
+    try:
+        cache_dir = get_cache_dir("audio")
+    except OSError:
+        cache_dir = None
+
+    if cache_dir is None:
+        # No usable cache directory: convert next to the source as before.
+        wav_file_path = file_path.rsplit(".", 1)[0] + ".wav"
+        if wav_file_path == file_path:
+            wav_file_path = file_path.rsplit(".", 1)[0] + ".16k.wav"
+        _run_ffmpeg(file_path, wav_file_path)
+        return wav_file_path
+
+    wav_file_path = str(cache_dir / f"{_fingerprint(file_path)}.wav")
+    if _is_stt_ready(wav_file_path):
+        return wav_file_path
+
+    # Write under a unique temporary name, so concurrent conversions of the same source
+    # (e.g. two sessions in this process) never share a file and an interrupted run
+    # never leaves a partial WAV behind.
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(tmp_fd)
+    try:
+        _run_ffmpeg(file_path, tmp_path)
+        os.replace(tmp_path, wav_file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return wav_file_path
+
 
 def convert_audio_to_wav(file_path: str) -> str:
     """
     Converts an audio file to WAV format with PCM encoding, a 16kHz sample rate, and mono channel.
-    
-    If the file is already in WAV format, the same file path is returned.
-    
+
+    If the file already holds 16kHz mono 16-bit PCM WAV data (checked from its header, not its
+    extension), the same file path is returned. Otherwise it is re-encoded by a single ffmpeg
+    process, which streams the decode/encode natively instead of buffering every sample in Python.
+
+    Converted files are kept in the audio cache directory, named after a SHA-256 of the
+    whole source file, so the same recording is only converted once across calls and runs.
+
     Args:
       file_path (str): The path to the input audio file.
-    
+
     Returns:
       str: The path to the converted WAV file.
-      
+
     Raises:
       ValueError: If file_path is None or empty.
+      RuntimeError: If ffmpeg fails to convert the file.
     """
     if not file_path:
         raise ValueError("No file path provided to convert_audio_to_wav.")
-    
-    # If already a WAV file, return the file path unchanged.
-    if file_path.lower().endswith(".wav"):
-        return file_path
 
-    # Convert MP3 or other formats to WAV
-    wav_file_path = file_path.rsplit(".", 1)[0] + ".wav"
-    audio = AudioSegment.from_file(file_path)
-    # Convert audio: set to 16kHz sample rate, mono channel, 16-bit PCM.
-    audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-    audio.export(wav_file_path, format="wav")
+    stat = os.stat(file_path)
+    wav_file_path = _convert_cached(file_path, stat.st_mtime_ns, stat.st_size)
+    if not os.path.exists(wav_file_path):
+        # The cached WAV was removed behind our back; convert again.
+        _convert_cached.cache_clear()
+        wav_file_path = _convert_cached(file_path, stat.st_mtime_ns, stat.st_size)
     return wav_file_path
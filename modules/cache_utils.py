@@ -0,0 +1,17 @@
+"""
+On-disk cache locations shared by the modules.
+
+Everything lives under STTLOCAL_CACHE_DIR (default: ~/.cache/sttlocal), so cached
+results survive app restarts and can be cleared by deleting a single directory.
+"""
+
+import os
+from pathlib import Path
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """Returns the cache subdirectory for the given path parts, creating it if needed."""
+    base = Path(os.getenv("STTLOCAL_CACHE_DIR") or Path.home() / ".cache" / "sttlocal")
+    path = base.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
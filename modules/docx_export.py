@@ -1,14 +1,42 @@
+from io import BytesIO
+
 from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 
 def ticks_to_time(ticks):
     """
     Converts ticks (100-nanosecond intervals) to a formatted time string HH:MM:SS.mmm.
     """
-    seconds = ticks / 10_000_000  # convert ticks to seconds
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+    # Pure integer math: no float rounding, milliseconds are truncated.
+    milliseconds = int(ticks) // 10_000  # convert ticks to milliseconds
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def _build_paragraph(text, style_id=None):
+    """
+    Builds a raw <w:p><w:r><w:t>...</w:t></w:r></w:p> element, bypassing the per-call
+    overhead of document.add_paragraph. Newlines become <w:br/> like python-docx does.
+    """
+    paragraph = OxmlElement("w:p")
+    if style_id:
+        paragraph_properties = OxmlElement("w:pPr")
+        paragraph_style = OxmlElement("w:pStyle")
+        paragraph_style.set(qn("w:val"), style_id)
+        paragraph_properties.append(paragraph_style)
+        paragraph.append(paragraph_properties)
+    run = OxmlElement("w:r")
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            run.append(OxmlElement("w:br"))
+        text_element = OxmlElement("w:t")
+        text_element.set(qn("xml:space"), "preserve")
+        text_element.text = line
+        run.append(text_element)
+    paragraph.append(run)
+    return paragraph
 
 def export_transcription_to_docx(transcription_results, analysis_text=None, 
                                  translated_transcription=None, cleaned_transcription=None, 
@@ -27,15 +55,20 @@ def export_transcription_to_docx(transcription_results, analysis_text=None,
       - analysis_text (str): Optional analysis text to include.
       - translated_transcription (str): Optional translated transcription text.
       - cleaned_transcription (str): Optional cleaned transcription text.
-      - output_filename (str): Output file name for the DOCX document.
+      - output_filename (str or file-like): Output file name for the DOCX document, or a writable
+        binary stream (e.g. io.BytesIO) to build the document in memory without touching disk.
     
     Returns:
-      - str: The output file name of the generated DOCX file.
+      - str or file-like: The output_filename argument the DOCX was written to.
     """
     document = Document()
     document.add_heading("Transcription", level=0)
     
     # Add transcription segments with speaker and timing details.
+    # Paragraphs are built as raw XML and inserted in one pass before the section properties.
+    body = document.element.body
+    section_properties = body.find(qn("w:sectPr"))
+    quote_style_id = document.styles["Intense Quote"].style_id
     for result in transcription_results:
         speaker = result.get("speaker_name", result.get("speaker_id", "Unknown"))
         text = result.get("text", "")
@@ -43,8 +76,14 @@ def export_transcription_to_docx(transcription_results, analysis_text=None,
         duration = result.get("duration", 0)
         start_time = ticks_to_time(offset)
         duration_time = ticks_to_time(duration)
-        document.add_paragraph(f"Speaker {speaker}: {text}")
-        document.add_paragraph(f"(Start Time: {start_time}, Duration: {duration_time})", style="Intense Quote")
+        for paragraph in (
+            _build_paragraph(f"Speaker {speaker}: {text}"),
+            _build_paragraph(f"(Start Time: {start_time}, Duration: {duration_time})", quote_style_id),
+        ):
+            if section_properties is not None:
+                section_properties.addprevious(paragraph)
+            else:
+                body.append(paragraph)
     
     # Add Cleaned Transcription section if provided.
     if cleaned_transcription:
@@ -66,3 +105,17 @@ def export_transcription_to_docx(transcription_results, analysis_text=None,
     
     document.save(output_filename)
     return output_filename
+
+def export_transcription_to_docx_bytes(transcription_results, analysis_text=None,
+                                       translated_transcription=None, cleaned_transcription=None):
+    """
+    Builds the same document as export_transcription_to_docx in memory and returns its bytes.
+
+    Takes and returns only picklable values, so it can run in a worker process.
+    """
+    buffer = BytesIO()
+    export_transcription_to_docx(transcription_results, analysis_text=analysis_text,
+                                 translated_transcription=translated_transcription,
+                                 cleaned_transcription=cleaned_transcription,
+                                 output_filename=buffer)
+    return buffer.getvalue()
@@ -1,6 +1,6 @@
 """
 Transcript analysis using:
-- Azure OpenAI (GPT-4o deployment) via the OpenAI Python SDK (new or legacy style)
+- Azure OpenAI (GPT-4o deployment) via the OpenAI Python SDK (AzureOpenAI client, openai>=1.x)
 - Phi-4 (or any chat model endpoint) via azure.ai.inference ChatCompletionsClient
 
 Returns a Romanian, structured analysis:
@@ -16,22 +16,31 @@ Never invent facts if missing from transcript.
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-from typing import Literal, Optional
+from functools import lru_cache
+from typing import Callable, Literal, Optional
 
-import openai
 from azure.ai.inference import ChatCompletionsClient
 from azure.core.credentials import AzureKeyCredential
 from dotenv import load_dotenv
+from openai import AzureOpenAI
+
+from modules.cache_utils import get_cache_dir
 
 load_dotenv()
 
 
 Engine = Literal["gpt4o", "phi4"]
+DeltaCallback = Callable[[str], None]
 
 DEFAULT_AZURE_OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2025-01-01-preview")
 DEFAULT_DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME", "gpt-4o")
 
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_PENDING_STATUSES = ("validating", "in_progress", "finalizing")
+
 SYSTEM_PROMPT_RO = (
     "You are an assistant that analyzes meeting or conversation transcripts from any domain. "
     "Create a structured, practical output in Romanian with these sections: "
@@ -51,11 +60,13 @@ def _require_env(name: str, value: Optional[str]) -> str:
     return value.strip()
 
 
+@lru_cache(maxsize=8)
 def _normalize_endpoint(endpoint: str) -> str:
     # Keep it stable (no trailing slash).
     return endpoint.strip().rstrip("/")
 
 
+@lru_cache(maxsize=8)
 def _normalize_phi_endpoint(endpoint: str) -> str:
     """
     Accepts endpoints that may include common suffixes and normalizes to the base.
@@ -81,73 +92,160 @@ def _build_messages(transcription_text: str) -> list[dict]:
     ]
 
 
-def _analyze_with_azure_openai(messages: list[dict]) -> str:
-    """
-    Uses the OpenAI Python SDK in a version-tolerant way:
-    - openai>=1.x: AzureOpenAI client
-    - openai<1.x (legacy): openai.ChatCompletion.create + global config
-    """
+def _azure_openai_settings() -> tuple[str, str, str, str]:
+    """Returns (endpoint, api_key, deployment, api_version) from the environment."""
     endpoint = _require_env("OPENAI_ENDPOINT", os.getenv("OPENAI_ENDPOINT"))
     api_key = _require_env("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
     deployment = os.getenv("DEPLOYMENT_NAME", DEFAULT_DEPLOYMENT_NAME).strip()
     api_version = os.getenv("OPENAI_API_VERSION", DEFAULT_AZURE_OPENAI_API_VERSION).strip()
+    return _normalize_endpoint(endpoint), api_key, deployment, api_version
 
-    endpoint = _normalize_endpoint(endpoint)
 
-    # Try modern SDK first (openai>=1.x)
-    try:
-        from openai import AzureOpenAI  # type: ignore
-
-        client = AzureOpenAI(
-            api_key=api_key,
-            azure_endpoint=endpoint,
-            api_version=api_version,
-        )
-
-        resp = client.chat.completions.create(
-            model=deployment,
-            messages=messages,
-            max_tokens=2000,
-            temperature=0.7,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0,
-        )
-
-        content = (resp.choices[0].message.content or "").strip()
-        return content
-
-    except Exception:
-        # Fall back to legacy style (openai<1.x)
-        openai.api_type = "azure"
-        openai.api_base = endpoint
-        openai.api_version = api_version
-        openai.api_key = api_key
-
-        resp = openai.ChatCompletion.create(
-            engine=deployment,
-            messages=messages,
-            max_tokens=2000,
-            temperature=0.7,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0,
-        )
-
-        content = (resp.choices[0].message["content"] or "").strip()
-        return content
-
-
-def _analyze_with_phi4(messages: list[dict]) -> str:
+@lru_cache(maxsize=1)
+def _get_azure_client(endpoint: str, api_version: str, api_key: str):
+    """
+    Returns a shared AzureOpenAI client. Reusing it keeps the SDK's
+    keep-alive connection pool warm, so later calls skip the TCP/TLS handshake.
+    """
+    return AzureOpenAI(
+        api_key=api_key,
+        azure_endpoint=endpoint,
+        api_version=api_version,
+    )
+
+
+def _collect_stream(chunks, on_delta: DeltaCallback, get_delta: Callable) -> str:
+    """Forwards each streamed text delta to on_delta and returns the full content."""
+    parts = []
+    for chunk in chunks:
+        # Azure emits chunks without choices (e.g. content filter results); skip them.
+        if not chunk.choices:
+            continue
+        delta = get_delta(chunk.choices[0]) or ""
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts).strip()
+
+
+def _analyze_with_azure_openai(messages: list[dict], on_delta: Optional[DeltaCallback] = None) -> str:
+    """
+    Runs the analysis on the Azure OpenAI deployment through the shared AzureOpenAI client.
+
+    If on_delta is given, the response is streamed and each text delta is passed to it.
+    """
+    endpoint, api_key, deployment, api_version = _azure_openai_settings()
+    client = _get_azure_client(endpoint, api_version, api_key)
+
+    resp = client.chat.completions.create(
+        model=deployment,
+        messages=messages,
+        max_tokens=2000,
+        temperature=0.7,
+        top_p=0.95,
+        frequency_penalty=0,
+        presence_penalty=0,
+        stream=on_delta is not None,
+    )
+
+    if on_delta is not None:
+        return _collect_stream(resp, on_delta, lambda choice: choice.delta.content)
+
+    content = (resp.choices[0].message.content or "").strip()
+    return content
+
+
+def _batch_client():
+    """AzureOpenAI client for the Batch API."""
+    endpoint, api_key, _deployment, api_version = _azure_openai_settings()
+    return _get_azure_client(endpoint, api_version, api_key)
+
+
+def submit_analysis_batch(transcription_text: str) -> str:
+    """
+    Queues the analysis on the Azure OpenAI Batch API and returns the batch id.
+
+    Batch jobs are cheaper than synchronous calls and complete within
+    BATCH_COMPLETION_WINDOW; poll with get_analysis_batch_result().
+    """
+    messages = _build_messages(transcription_text)
+    client = _batch_client()
+    _endpoint, _api_key, deployment, _api_version = _azure_openai_settings()
+    # Batch jobs run on a GlobalBatch deployment; defaults to the regular deployment name.
+    batch_deployment = os.getenv("BATCH_DEPLOYMENT_NAME", deployment).strip()
+
+    request_line = {
+        "custom_id": "analysis",
+        "method": "POST",
+        "url": "/chat/completions",
+        "body": {
+            "model": batch_deployment,
+            "messages": messages,
+            "max_tokens": 2000,
+            "temperature": 0.7,
+            "top_p": 0.95,
+            "frequency_penalty": 0,
+            "presence_penalty": 0,
+        },
+    }
+    batch_input = client.files.create(
+        file=("analysis.jsonl", (json.dumps(request_line, ensure_ascii=False) + "\n").encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint="/chat/completions",
+        completion_window=BATCH_COMPLETION_WINDOW,
+    )
+    return batch.id
+
+
+def get_analysis_batch_result(batch_id: str) -> Optional[str]:
+    """
+    Returns the analysis text of a completed batch, or None while it is still running.
+
+    Raises RuntimeError if the batch failed, expired or was cancelled.
+    """
+    client = _batch_client()
+    batch = client.batches.retrieve(batch_id)
+
+    if batch.status in BATCH_PENDING_STATUSES:
+        return None
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'.")
+
+    output = client.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        body = (record.get("response") or {}).get("body") or {}
+        choices = body.get("choices") or []
+        if choices:
+            return (choices[0]["message"].get("content") or "").strip()
+
+    raise RuntimeError(f"Batch {batch_id} completed without a chat completion.")
+
+
+@lru_cache(maxsize=4)
+def _get_phi_client(endpoint: str, key: str) -> ChatCompletionsClient:
+    """
+    Returns a shared ChatCompletionsClient per (endpoint, key). The client's pipeline
+    and HTTP transport are built once, so later calls reuse pooled connections.
+    """
+    return ChatCompletionsClient(
+        endpoint=endpoint,
+        credential=AzureKeyCredential(key),
+    )
+
+
+def _analyze_with_phi4(messages: list[dict], on_delta: Optional[DeltaCallback] = None) -> str:
     phi_endpoint = _require_env("PHI4_ENDPOINT", os.getenv("PHI4_ENDPOINT"))
     phi_key = _require_env("PHI4_KEY", os.getenv("PHI4_KEY"))
 
     phi_endpoint = _normalize_phi_endpoint(phi_endpoint)
 
-    client = ChatCompletionsClient(
-        endpoint=phi_endpoint,
-        credential=AzureKeyCredential(phi_key),
-    )
+    client = _get_phi_client(phi_endpoint, phi_key)
 
     payload = {
         "messages": messages,
@@ -156,27 +254,109 @@ def _analyze_with_phi4(messages: list[dict]) -> str:
         "top_p": 0.95,
         "frequency_penalty": 0,
         "presence_penalty": 0,
+        "stream": on_delta is not None,
     }
 
     resp = client.complete(payload)
+    if on_delta is not None:
+        return _collect_stream(resp, on_delta, lambda choice: choice.delta.content)
+
     content = (resp.choices[0].message.content or "").strip()
     return content
 
 
-def analyze_transcription(transcription_text: str, engine: Engine = "gpt4o") -> str:
+def _analysis_target(engine: str) -> tuple[str, str]:
+    """Returns the (endpoint, deployment) the engine resolves to; phi4 has no deployment name."""
+    if engine == "gpt4o":
+        endpoint, _api_key, deployment, _api_version = _azure_openai_settings()
+        return endpoint, deployment
+    phi_endpoint = _require_env("PHI4_ENDPOINT", os.getenv("PHI4_ENDPOINT"))
+    return _normalize_phi_endpoint(phi_endpoint), ""
+
+
+def _analysis_cache_path(engine: str, messages: list[dict]):
+    """
+    Content-addressed cache file for an engine + model target + prompt combination
+    (None if unavailable). The resolved endpoint and deployment are part of the key,
+    so switching DEPLOYMENT_NAME, OPENAI_ENDPOINT or PHI4_ENDPOINT never serves an
+    analysis produced by a different model.
+    """
+    endpoint, deployment = _analysis_target(engine)
+    prompt = "\0".join([engine, endpoint, deployment] + [message["content"] for message in messages])
+    key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    try:
+        return get_cache_dir("analysis") / f"{key}.json"
+    except OSError:
+        return None
+
+
+def _read_cached_analysis(path) -> Optional[str]:
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["content"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_cached_analysis(path, engine: str, content: str) -> None:
+    if path is None:
+        return
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"engine": engine, "content": content}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The cache is an optimization only; never fail an analysis because of it.
+        pass
+
+
+def analyze_transcription(
+    transcription_text: str,
+    engine: Engine = "gpt4o",
+    async_batch: bool = False,
+    on_delta: Optional[DeltaCallback] = None,
+) -> str:
     """
     Analyze a transcript using either:
       - engine="gpt4o": Azure OpenAI deployment
       - engine="phi4": Azure AI Inference chat endpoint (Phi-4)
 
-    Returns Romanian, structured analysis text.
+    Returns Romanian, structured analysis text. Results are cached on disk by a SHA-256
+    of the engine, its resolved endpoint/deployment and the prompt, so re-analyzing an
+    unchanged transcript with the same model skips the model call.
+
+    If on_delta is given, the response is streamed and on_delta receives each text
+    delta as it arrives (a cached result is delivered as a single delta).
+
+    With async_batch=True (gpt4o only) the request is queued on the Azure OpenAI
+    Batch API instead and the batch id is returned; fetch the analysis later with
+    get_analysis_batch_result().
     """
+    if async_batch:
+        if engine != "gpt4o":
+            raise ValueError("Batch analysis is only available for engine 'gpt4o'.")
+        return submit_analysis_batch(transcription_text)
+
     messages = _build_messages(transcription_text)
 
     if engine == "gpt4o":
-        return _analyze_with_azure_openai(messages)
-
-    if engine == "phi4":
-        return _analyze_with_phi4(messages)
-
-    raise ValueError("Unsupported engine. Choose 'gpt4o' or 'phi4'.")
\ No newline at end of file
+        analyze = _analyze_with_azure_openai
+    elif engine == "phi4":
+        analyze = _analyze_with_phi4
+    else:
+        raise ValueError("Unsupported engine. Choose 'gpt4o' or 'phi4'.")
+
+    cache_path = _analysis_cache_path(engine, messages)
+    cached = _read_cached_analysis(cache_path)
+    if cached is not None:
+        if on_delta is not None:
+            on_delta(cached)
+        return cached
+
+    content = analyze(messages, on_delta)
+    if content:
+        _write_cached_analysis(cache_path, engine, content)
+    return content
\ No newline at end of file
@@ -2,21 +2,34 @@
 Local Speech-to-Text (Azure Speech Container) with diarization.
 
 Key goals:
+- Optionally split the WAV into overlapping chunks and transcribe them concurrently, each in its own session.
 - Feed WAV PCM into a PushAudioInputStream at a controlled pace (prevents buffering issues).
 - Auto-restart on common container hiccups (buffer exceeded / websocket drops / hangs).
 - Deduplicate segments across overlap windows.
+- Keep stdio off the SDK callback threads: debug lines go through a background writer.
 """
 
+import logging
 import os
+import queue
+import random
+import struct
+import sys
 import threading
 import time
-import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, TypedDict
 
 import azure.cognitiveservices.speech as speechsdk
 from dotenv import load_dotenv
 
-from modules.audio_utils import convert_audio_to_wav
+from modules.audio_utils import (
+    TARGET_CHANNELS,
+    TARGET_SAMPLE_RATE,
+    TARGET_SAMPLE_WIDTH,
+    convert_audio_to_wav,
+)
 
 load_dotenv()
 
@@ -28,11 +41,63 @@ HANG_TIMEOUT_S = float(os.getenv("LOCAL_STT_HANG_TIMEOUT_S", "45"))
 MAX_RESTARTS = int(os.getenv("LOCAL_STT_MAX_RESTARTS", "8"))
 
 CHUNK_MS = int(os.getenv("LOCAL_STT_CHUNK_MS", "100"))
-FEED_SPEED = float(os.getenv("LOCAL_STT_FEED_SPEED", "1.05"))
+# The feeder bursts freely until it is MAX_AHEAD_S of audio ahead of FEED_SPEED x realtime.
+FEED_SPEED = float(os.getenv("LOCAL_STT_FEED_SPEED", "8.0"))
+MAX_AHEAD_S = float(os.getenv("LOCAL_STT_MAX_AHEAD_S", "8.0"))
 
 OVERLAP_S = float(os.getenv("LOCAL_STT_OVERLAP_S", "1.5"))
 DEDUP_EPS_S = float(os.getenv("LOCAL_STT_DEDUP_EPS_S", "0.08"))
 
+# Parallel chunking (opt-in): with SESSION_CHUNK_S > 0 the WAV is split into windows of that
+# length transcribed by up to CONCURRENCY independent sessions. Each chunk starts OVERLAP_S
+# early and keeps listening past its window (up to BOUNDARY_MAX_S) until the utterance in
+# progress at the boundary has ended. Diarization is per session, so speaker ids are then
+# labelled with their chunk number.
+SESSION_CHUNK_S = float(os.getenv("LOCAL_STT_SESSION_CHUNK_S", "0"))
+BOUNDARY_MAX_S = float(os.getenv("LOCAL_STT_BOUNDARY_MAX_S", "60"))
+CONCURRENCY = int(os.getenv("LOCAL_STT_CONCURRENCY", "4"))
+
+# Prewarmed sessions older than this (jittered) are discarded instead of used.
+POOL_MAX_IDLE_S = float(os.getenv("LOCAL_STT_POOL_MAX_IDLE_S", "30"))
+# How long acquire() waits for a session being prewarmed before building one inline.
+POOL_ACQUIRE_WAIT_S = float(os.getenv("LOCAL_STT_POOL_ACQUIRE_WAIT_S", "5"))
+
+SCALE_100NS = 10_000_000
+# convert_audio_to_wav always yields 16kHz mono 16-bit PCM, so a frame is a fixed size.
+BYTES_PER_FRAME = TARGET_SAMPLE_WIDTH * TARGET_CHANNELS
+
+_RECOGNIZED_SPEECH = speechsdk.ResultReason.RecognizedSpeech
+
+# Positional reads are Unix-only; O_BINARY only exists (and matters) on Windows.
+_HAS_PREAD = hasattr(os, "pread")
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+# [DEBUG] output is on unless LOCAL_STT_DEBUG=0 (or the "sttlocal" logger is configured above DEBUG).
+_log = logging.getLogger("sttlocal")
+if _log.level == logging.NOTSET:
+    _log.setLevel(logging.DEBUG if os.getenv("LOCAL_STT_DEBUG", "1") != "0" else logging.INFO)
+
+_log_q: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+
+
+def _log_writer() -> None:
+    while True:
+        line = _log_q.get()
+        try:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+        except Exception:
+            pass
+
+
+threading.Thread(target=_log_writer, name="sttlocal-log", daemon=True).start()
+
+
+def _debug(msg: str) -> None:
+    """Queues a [DEBUG] line for the writer thread, so callers never block on stdio."""
+    if _log.isEnabledFor(logging.DEBUG):
+        _log_q.put_nowait(f"[DEBUG] {msg}")
+
 
 class TranscriptSegment(TypedDict):
     speaker_id: Optional[str]
@@ -42,12 +107,45 @@ class TranscriptSegment(TypedDict):
 
 
 def _wav_info(path: str) -> dict:
-    """Return basic WAV metadata for PCM feeding."""
-    with wave.open(path, "rb") as wf:
-        frames = wf.getnframes()
-        rate = wf.getframerate()
-        channels = wf.getnchannels()
-        bits_per_sample = wf.getsampwidth() * 8
+    """
+    Return basic WAV metadata for PCM feeding, plus where the sample data lives.
+
+    The RIFF header is parsed directly (a few small reads) so the feeders can map the
+    data chunk instead of re-opening the file with the wave module on every session.
+    """
+    fmt = b""
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"Not a RIFF/WAVE file: {path}")
+
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in WAV: {path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"data":
+                data_offset = f.tell()
+                break
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size & 1, os.SEEK_CUR)
+            else:
+                # RIFF chunks are word aligned.
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+        file_size = os.fstat(f.fileno()).st_size
+
+    if len(fmt) < 16:
+        raise ValueError(f"Missing fmt chunk in WAV: {path}")
+    format_tag, channels, rate, _byte_rate, block_align, bits_per_sample = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag not in (1, 0xFFFE):  # PCM / WAVE_FORMAT_EXTENSIBLE
+        raise ValueError(f"Unsupported WAV encoding (format tag {format_tag}): {path}")
+
+    # Streaming writers may leave the data size unset or too large; never read past the file.
+    data_size = min(chunk_size, file_size - data_offset)
+    bytes_per_frame = max(block_align, 1)
+    frames = data_size // bytes_per_frame
 
     return {
         "frames": frames,
@@ -55,27 +153,48 @@ def _wav_info(path: str) -> dict:
         "channels": channels,
         "bits_per_sample": bits_per_sample,
         "duration": (frames / float(rate)) if rate else 0.0,
+        "data_offset": data_offset,
+        "path": path,
+        "bytes_per_frame": bytes_per_frame,
     }
 
 
 class _WavFeeder(threading.Thread):
-    """Feeds WAV PCM bytes into a PushAudioInputStream at a controlled pace."""
+    """
+    Feeds WAV PCM bytes into a PushAudioInputStream at a controlled pace.
+
+    The PCM is read with os.pread from a descriptor shared by all feeders: there is no
+    per-session file open or header parse, reads carry their own offset so feeders never
+    race on a file position, and the GIL is released for the duration of each read.
+    Where os.pread is missing (Windows), each feeder seeks and reads its own descriptor.
+
+    There is no fixed per-chunk sleep: the feeder only waits once it has sent more than
+    MAX_AHEAD_S of audio beyond what feed_speed x realtime allows for the elapsed time,
+    and then only until a deadline on the monotonic clock (no drift, no wall-clock jumps).
+    """
 
     def __init__(
         self,
-        wav_path: str,
+        fd: int,
+        wav: dict,
         push_stream: speechsdk.audio.PushAudioInputStream,
         start_frame: int,
+        end_frame: int,
         chunk_frames: int,
-        sleep_per_chunk_s: float,
+        rate: int,
+        feed_speed: float,
         stop_event: threading.Event,
     ):
         super().__init__(daemon=True)
-        self.wav_path = wav_path
+        self.fd = fd
+        self.data_offset = int(wav["data_offset"])
+        self.wav_path = wav["path"]
         self.push_stream = push_stream
         self.start_frame = start_frame
+        self.end_frame = end_frame
         self.chunk_frames = chunk_frames
-        self.sleep_per_chunk_s = sleep_per_chunk_s
+        self.rate = rate
+        self.feed_speed = max(feed_speed, 0.1)
         self.stop_event = stop_event
 
         self.frames_sent = 0
@@ -83,36 +202,164 @@ class _WavFeeder(threading.Thread):
         self.error: Optional[Exception] = None
 
     def run(self) -> None:
+        own_fd: Optional[int] = None
         try:
-            with wave.open(self.wav_path, "rb") as wf:
-                wf.setpos(self.start_frame)
-
-                bytes_per_frame = wf.getsampwidth() * wf.getnchannels()
-                bytes_per_frame = max(bytes_per_frame, 1)
-
-                while not self.stop_event.is_set():
-                    data = wf.readframes(self.chunk_frames)
-                    if not data:
-                        self.finished = True
-                        break
-
-                    self.push_stream.write(data)
-
-                    read_frames = len(data) // bytes_per_frame
-                    self.frames_sent += read_frames
-
-                    time.sleep(self.sleep_per_chunk_s)
+            chunk_bytes = self.chunk_frames * BYTES_PER_FRAME
+            cursor = self.data_offset + self.start_frame * BYTES_PER_FRAME
+            end = self.data_offset + self.end_frame * BYTES_PER_FRAME
+            if not _HAS_PREAD:
+                own_fd = os.open(self.wav_path, os.O_RDONLY | _O_BINARY)
+                os.lseek(own_fd, cursor, os.SEEK_SET)
+            started = time.monotonic()
+
+            while not self.stop_event.is_set():
+                if cursor >= end:
+                    self.finished = True
+                    break
+
+                size = min(chunk_bytes, end - cursor)
+                data = os.pread(self.fd, size, cursor) if own_fd is None else os.read(own_fd, size)
+                if not data:
+                    raise EOFError(f"WAV data ends before byte {end}")
+                self.push_stream.write(data)
+
+                cursor += len(data)
+                self.frames_sent += len(data) // BYTES_PER_FRAME
+
+                # Absolute deadline for the next write, derived from what has been sent so far,
+                # so sleep overshoot is absorbed instead of accumulating as drift.
+                next_deadline = started + (self.frames_sent / self.rate - MAX_AHEAD_S) / self.feed_speed
+                now = time.monotonic()
+                if now < next_deadline:
+                    time.sleep(next_deadline - now)
 
         except Exception as exc:
             # Any runtime feeder error should trigger a restart upstream.
             self.error = exc
         finally:
+            if own_fd is not None:
+                os.close(own_fd)
             try:
                 self.push_stream.close()
             except Exception:
                 pass
 
 
+class _TranscriberPool:
+    """
+    Keeps ConversationTranscriber sessions with an already-open websocket ready for use.
+
+    The SDK binds a transcriber to its PushAudioInputStream for life, so a session is
+    single-use. Instead of reusing sessions, acquire() takes a prewarmed one and, while
+    chunks are still waiting for a session, starts building a replacement in the
+    background. The websocket handshake and SDK setup then happen off the chunk/restart
+    hot path, and at most `size` sessions are warm or being built at any time.
+    """
+
+    def __init__(
+        self,
+        speech_config: speechsdk.SpeechConfig,
+        stream_format: speechsdk.audio.AudioStreamFormat,
+        size: int,
+        demand: int,
+    ):
+        self.speech_config = speech_config
+        self.stream_format = stream_format
+        self.size = size
+        self._ready: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        # acquire() calls still expected (one per chunk) and sessions queued or being built.
+        self._remaining = demand
+        self._in_flight = 0
+        for _ in range(min(size, demand)):
+            self._refill()
+
+    def _build(self) -> dict:
+        push_stream = speechsdk.audio.PushAudioInputStream(self.stream_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
+        transcriber = speechsdk.transcription.ConversationTranscriber(
+            speech_config=self.speech_config,
+            audio_config=audio_config,
+        )
+        connection = speechsdk.Connection.from_recognizer(transcriber)
+        connection.open(True)
+        return {
+            "push_stream": push_stream,
+            "transcriber": transcriber,
+            "connection": connection,
+            # Jitter so sessions built together do not all expire together.
+            "expires_at": time.time() + POOL_MAX_IDLE_S * random.uniform(0.8, 1.0),
+        }
+
+    def _refill(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+        def build() -> None:
+            try:
+                session = self._build()
+            except Exception as exc:
+                with self._lock:
+                    self._in_flight -= 1
+                _debug(f"Could not prewarm transcriber session: {exc}")
+                return
+            with self._lock:
+                closed = self._closed
+                if closed:
+                    self._in_flight -= 1
+                else:
+                    self._ready.put(session)
+            if closed:
+                self.release(session)
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def acquire(self) -> dict:
+        """
+        Returns a prewarmed session. Waits up to POOL_ACQUIRE_WAIT_S for one that is being
+        built, and builds one inline if none is coming (e.g. for a restart).
+        """
+        with self._lock:
+            self._remaining -= 1
+        deadline = time.time() + POOL_ACQUIRE_WAIT_S
+        while True:
+            with self._lock:
+                pending = self._in_flight > 0
+            if not pending:
+                return self._build()
+            try:
+                session = self._ready.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return self._build()
+
+            with self._lock:
+                self._in_flight -= 1
+                refill = self._in_flight < min(self.size, self._remaining)
+            if refill:
+                self._refill()
+            if session["expires_at"] > time.time():
+                return session
+            self.release(session)
+
+    def release(self, session: dict) -> None:
+        """Closes a session that has been used (or has expired)."""
+        for close in (session["connection"].close, session["push_stream"].close):
+            try:
+                close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self.release(self._ready.get_nowait())
+            except queue.Empty:
+                return
+
+
 def create_local_speech_config(language: str) -> speechsdk.SpeechConfig:
     """
     Creates a SpeechConfig for the local Azure Speech container, using ws:// endpoints
@@ -133,8 +380,8 @@ def create_local_speech_config(language: str) -> speechsdk.SpeechConfig:
     full_endpoint = (
         f"{host_endpoint}/speech/recognition/dictation/cognitiveservices/v1"
     )
-    print(
-        f"[DEBUG] Using local STT endpoint for '{language}': "
+    _debug(
+        f"Using local STT endpoint for '{language}': "
         f"host={host_endpoint}, endpoint={full_endpoint}"
     )
 
@@ -174,59 +421,87 @@ def create_local_speech_config(language: str) -> speechsdk.SpeechConfig:
     return speech_config
 
 
-def transcribe_with_diarization_local(file_path: str, language: str) -> list[TranscriptSegment]:
-    """
-    Transcribes an audio file with diarization using the local Azure Speech container.
+@lru_cache(maxsize=8)
+def _speech_config(language: str) -> speechsdk.SpeechConfig:
+    """The SpeechConfig is only read by the SDK, so one per language is built and reused."""
+    return create_local_speech_config(language)
 
-    Returns:
-        [
-          {"speaker_id": str|None, "text": str, "offset": int, "duration": int},
-          ...
-        ]
-    """
-    wav_path = convert_audio_to_wav(file_path)
-    speech_config = create_local_speech_config(language)
 
-    wav = _wav_info(wav_path)
-    total_frames = int(wav["frames"])
-    rate = int(wav["rate"])
-    channels = int(wav["channels"])
-    bits_per_sample = int(wav["bits_per_sample"])
-    wav_duration = float(wav["duration"])
+def _safe_lower(s: Optional[str]) -> str:
+    return (s or "").lower()
+
 
-    if rate <= 0 or channels <= 0 or bits_per_sample <= 0:
-        raise ValueError(f"Invalid WAV metadata for: {wav_path}")
+def _chunk_bounds(total_frames: int, rate: int) -> list[tuple[int, int]]:
+    """
+    Splits [0, total_frames) into the SESSION_CHUNK_S windows each chunk owns; a single
+    window when chunking is off. A remainder shorter than OVERLAP_S is folded into the
+    previous window instead of becoming a chunk made almost entirely of overlap.
+    """
+    if SESSION_CHUNK_S <= 0:
+        return [(0, total_frames)]
+
+    chunk_frames = max(1, int(SESSION_CHUNK_S * rate))
+    overlap_frames = int(OVERLAP_S * rate)
+
+    bounds = []
+    start = 0
+    while start < total_frames:
+        end = min(total_frames, start + chunk_frames)
+        if total_frames - end < overlap_frames:
+            end = total_frames
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _transcribe_single_chunk(
+    fd: int,
+    start_frame: int,
+    end_frame: int,
+    pool: _TranscriberPool,
+    wav: dict,
+    chunk_idx: int,
+    own_end_frame: Optional[int] = None,
+) -> list[TranscriptSegment]:
+    """
+    Transcribes frames [start_frame, end_frame) in its own ConversationTranscriber session,
+    restarting (with overlap and backoff) on container hiccups. Offsets are absolute.
+    Segments are returned in arrival order, including any repeated by a restart's overlap;
+    the caller deduplicates them.
+
+    With own_end_frame set, the chunk is complete as soon as a result starts at or after it:
+    every utterance that began inside the chunk's window has ended by then, so the audio
+    fed beyond it (up to end_frame) is only there to hear such an utterance out.
+    """
+    rate = int(wav["rate"])
 
     chunk_frames = max(1, int(rate * (CHUNK_MS / 1000.0)))
-    sleep_per_chunk_s = (CHUNK_MS / 1000.0) / max(FEED_SPEED, 0.1)
+    overlap_frames = int(OVERLAP_S * rate)
+    feed_speed = FEED_SPEED
 
-    scale_100ns = 10_000_000
+    scale_100ns = SCALE_100NS
+    own_end_100ns = own_end_frame * scale_100ns // rate if own_end_frame is not None else None
 
     transcription_results: list[TranscriptSegment] = []
-    accepted_last_end_s = -1.0
 
-    cursor_frame = 0
+    cursor_frame = start_frame
     restarts = 0
     backoff_s = 1.0
 
-    while cursor_frame < total_frames:
+    while cursor_frame < end_frame:
         session_idx = restarts
-        session_base_s = cursor_frame / float(rate)
-
-        stream_format = speechsdk.audio.AudioStreamFormat(
-            samples_per_second=rate,
-            bits_per_sample=bits_per_sample,
-            channels=channels,
-        )
-        push_stream = speechsdk.audio.PushAudioInputStream(stream_format)
-        audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
-
-        conversation_transcriber = speechsdk.transcription.ConversationTranscriber(
-            speech_config=speech_config,
-            audio_config=audio_config,
-        )
-
-        done = False
+        session_start_frame = cursor_frame
+        session_base_100ns = cursor_frame * scale_100ns // rate
+        # End of the audio the service has returned results for, relative to the session.
+        recognized_end_100ns = 0
+        # Set once a result starts past the chunk's window (see own_end_100ns).
+        past_window = False
+
+        session = pool.acquire()
+        push_stream = session["push_stream"]
+        conversation_transcriber = session["transcriber"]
+
+        done_event = threading.Event()
         restart_needed = False
         restart_reason: Optional[str] = None
 
@@ -235,59 +510,60 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
 
         stop_event = threading.Event()
         feeder = _WavFeeder(
-            wav_path=wav_path,
+            fd=fd,
+            wav=wav,
             push_stream=push_stream,
             start_frame=cursor_frame,
+            end_frame=end_frame,
             chunk_frames=chunk_frames,
-            sleep_per_chunk_s=sleep_per_chunk_s,
+            rate=rate,
+            feed_speed=feed_speed,
             stop_event=stop_event,
         )
 
-        def _safe_lower(s: Optional[str]) -> str:
-            return (s or "").lower()
-
         def transcribed_cb(evt) -> None:
-            nonlocal accepted_last_end_s, last_activity
+            nonlocal last_activity, recognized_end_100ns, past_window
             last_activity = time.time()
 
-            result = getattr(evt, "result", None)
-            if not result or getattr(result, "reason", None) != speechsdk.ResultReason.RecognizedSpeech:
+            # Hot path: plain attribute access; an unexpected event shape is simply skipped.
+            try:
+                result = evt.result
+                offset_100ns = result.offset or 0
+                duration_100ns = result.duration or 0
+                # Speech or not (NoMatch covers silence), audio up to here has been processed.
+                recognized_end_100ns = max(recognized_end_100ns, offset_100ns + duration_100ns)
+                if own_end_100ns is not None and offset_100ns + session_base_100ns >= own_end_100ns:
+                    # The next chunk owns this one; everything started in our window is done.
+                    past_window = True
+                    done_event.set()
+                    return
+                if result.reason != _RECOGNIZED_SPEECH:
+                    return
+                text = (result.text or "").strip()
+                speaker_id = result.speaker_id
+            except AttributeError:
                 return
-
-            text = (getattr(result, "text", "") or "").strip()
             if not text:
                 return
 
-            offset_100ns = int(getattr(result, "offset", 0) or 0)
-            duration_100ns = int(getattr(result, "duration", 0) or 0)
-
-            seg_start_s = (offset_100ns / scale_100ns) + session_base_s
-            seg_end_s = ((offset_100ns + duration_100ns) / scale_100ns) + session_base_s
-
-            # Deduplicate across overlaps
-            if seg_end_s <= accepted_last_end_s + DEDUP_EPS_S:
-                return
-
-            speaker_id = getattr(result, "speaker_id", None)
-
+            # Capture only; overlap dedup runs once over the merged results.
             transcription_results.append(
                 {
                     "speaker_id": speaker_id,
                     "text": text,
-                    "offset": int(seg_start_s * scale_100ns),
-                    "duration": int((seg_end_s - seg_start_s) * scale_100ns),
+                    "offset": offset_100ns + session_base_100ns,
+                    "duration": duration_100ns,
                 }
             )
-
-            accepted_last_end_s = max(accepted_last_end_s, seg_end_s)
-            print(f"[DEBUG] TRANSCRIBED s{session_idx} {speaker_id}: {text}")
+            if _log.isEnabledFor(logging.DEBUG):
+                _debug(f"TRANSCRIBED c{chunk_idx}s{session_idx} {speaker_id}: {text}")
 
         def transcribing_cb(evt) -> None:
             nonlocal last_activity, last_print
             last_activity = time.time()
 
             now = time.time()
-            if now - last_print < DISPLAY_EVERY_S:
+            if now - last_print < DISPLAY_EVERY_S or not _log.isEnabledFor(logging.DEBUG):
                 return
 
             result = getattr(evt, "result", None)
@@ -295,11 +571,11 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
             speaker_id = getattr(result, "speaker_id", None) if result else None
 
             if text:
-                print(f"[DEBUG] TRANSCRIBING s{session_idx} {speaker_id}: {text[:140]}")
+                _debug(f"TRANSCRIBING c{chunk_idx}s{session_idx} {speaker_id}: {text[:140]}")
             last_print = now
 
         def canceled_cb(evt) -> None:
-            nonlocal done, restart_needed, restart_reason
+            nonlocal restart_needed, restart_reason
 
             # Different event shapes exist; be defensive.
             result = getattr(evt, "result", None)
@@ -316,11 +592,10 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
             else:
                 restart_reason = error_details or "canceled"
 
-            done = True
+            done_event.set()
 
         def session_stopped_cb(_evt) -> None:
-            nonlocal done
-            done = True
+            done_event.set()
 
         conversation_transcriber.transcribed.connect(transcribed_cb)
         conversation_transcriber.transcribing.connect(transcribing_cb)
@@ -330,12 +605,15 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
         feeder.start()
         conversation_transcriber.start_transcribing_async().get()
 
-        while not done:
-            time.sleep(0.5)
-            if time.time() - last_activity > HANG_TIMEOUT_S:
+        # Block until the session ends or the hang deadline passes. Activity only moves the
+        # deadline, so waking at the old one just recomputes how long is left.
+        while not done_event.is_set():
+            remaining_s = HANG_TIMEOUT_S - (time.time() - last_activity)
+            if remaining_s <= 0:
                 restart_needed = True
                 restart_reason = "hang_timeout"
-                done = True
+                break
+            done_event.wait(remaining_s)
 
         stop_event.set()
         try:
@@ -344,16 +622,17 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
             pass
 
         feeder.join(timeout=5)
+        pool.release(session)
 
-        # Advance cursor by what we actually fed this session
-        cursor_frame = min(total_frames, cursor_frame + int(feeder.frames_sent))
+        if past_window:
+            break
 
         # Decide whether to restart
         if feeder.error and not restart_needed:
             restart_needed = True
             restart_reason = f"feeder_error:{type(feeder.error).__name__}"
 
-        if not restart_needed and cursor_frame < total_frames and not feeder.finished:
+        if not restart_needed and not feeder.finished:
             restart_needed = True
             restart_reason = "session_stopped_early"
 
@@ -361,33 +640,158 @@ def transcribe_with_diarization_local(file_path: str, language: str) -> list[Tra
             restarts += 1
             if restarts > MAX_RESTARTS:
                 raise RuntimeError(
-                    f"Too many restarts ({MAX_RESTARTS}). Last reason: {restart_reason}"
+                    f"Too many restarts ({MAX_RESTARTS}) in chunk {chunk_idx}. Last reason: {restart_reason}"
                 )
 
-            overlap_frames = int(OVERLAP_S * rate)
-            cursor_frame = max(0, cursor_frame - overlap_frames)
+            # Resume from what the service actually returned results for, not from what was
+            # sent: the feeder runs well ahead of realtime, so audio that was pushed but never
+            # recognized must be fed again. The overlap re-covers a word cut at that point.
+            recognized_frame = min(end_frame, session_start_frame + recognized_end_100ns * rate // scale_100ns)
+            cursor_frame = max(session_start_frame, recognized_frame - overlap_frames)
 
-            print(
-                f"[DEBUG] Restarting transcription (reason={restart_reason}). "
-                f"cursor={cursor_frame / float(rate):.2f}s backoff={backoff_s:.1f}s"
+            # The container could not keep up with the burst; halve the feed speed (down to realtime).
+            if restart_reason == "client_buffer_exceeded":
+                feed_speed = max(min(1.0, feed_speed), feed_speed / 2.0)
+
+            _debug(
+                f"Restarting chunk {chunk_idx} transcription (reason={restart_reason}). "
+                f"cursor={cursor_frame / float(rate):.2f}s backoff={backoff_s:.1f}s feed_speed={feed_speed:.2f}x"
             )
 
             time.sleep(backoff_s)
             backoff_s = min(20.0, backoff_s * 2.0)
             continue
 
-        # If the container naturally segments sessions, loop continues until EOF.
-        if cursor_frame < total_frames:
-            continue
-
+        # The whole range was fed and the session ended cleanly.
         break
 
+    return transcription_results
+
+
+def _merge_chunk_results(
+    bounds: list[tuple[int, int]],
+    chunk_results: list[list[TranscriptSegment]],
+    rate: int,
+) -> list[TranscriptSegment]:
+    """
+    Merges per-chunk results in order. A chunk keeps only segments starting inside the
+    window it owns (it listened on until those had ended; the neighbouring chunk's copy
+    may be cut), then a single pass drops every segment already covered by a restart
+    overlap within its chunk.
+    """
+    dedup_eps_100ns = int(DEDUP_EPS_S * SCALE_100NS)
+    chunked = len(bounds) > 1
+    transcription_results: list[TranscriptSegment] = []
+    accepted_last_end = -1
+    for chunk_idx, ((own_start, own_end), segments) in enumerate(zip(bounds, chunk_results)):
+        own_start_100ns = own_start * SCALE_100NS // rate if chunk_idx > 0 else -1
+        own_end_100ns = own_end * SCALE_100NS // rate if chunk_idx < len(bounds) - 1 else float("inf")
+        for segment in segments:
+            if not own_start_100ns <= segment["offset"] < own_end_100ns:
+                continue
+            seg_end = segment["offset"] + segment["duration"]
+            if seg_end <= accepted_last_end + dedup_eps_100ns:
+                continue
+            if chunked and segment["speaker_id"] is not None:
+                # Speaker ids are only meaningful within one chunk's diarization session.
+                segment["speaker_id"] = f"{segment['speaker_id']} (part {chunk_idx + 1})"
+            transcription_results.append(segment)
+            accepted_last_end = seg_end
+    return transcription_results
+
+
+def transcribe_with_diarization_local(file_path: str, language: str) -> list[TranscriptSegment]:
+    """
+    Transcribes an audio file with diarization using the local Azure Speech container.
+
+    By default the whole file is transcribed in one session (restarted on container
+    hiccups). With LOCAL_STT_SESSION_CHUNK_S > 0 the audio is split into overlapping
+    chunks transcribed concurrently (LOCAL_STT_CONCURRENCY sessions); results are merged
+    in order and deduplicated across the overlaps. Speaker ids come from the container's
+    diarization, which is per session, so with chunking they are suffixed with the chunk
+    ("Guest-1 (part 3)") rather than conflating unrelated speakers.
+
+    Returns:
+        [
+          {"speaker_id": str|None, "text": str, "offset": int, "duration": int},
+          ...
+        ]
+    """
+    wav_path = convert_audio_to_wav(file_path)
+    speech_config = _speech_config(language)
+
+    wav = _wav_info(wav_path)
+    total_frames = int(wav["frames"])
+    rate = int(wav["rate"])
+    wav_duration = float(wav["duration"])
+
+    # Everything is fed as 16kHz mono 16-bit PCM: the fewest bytes per second of audio
+    # on the wire, and what the container works with internally anyway.
+    if (
+        rate != TARGET_SAMPLE_RATE
+        or wav["channels"] != TARGET_CHANNELS
+        or wav["bytes_per_frame"] != BYTES_PER_FRAME
+        or wav["bits_per_sample"] != TARGET_SAMPLE_WIDTH * 8
+    ):
+        raise ValueError(f"WAV is not 16kHz mono 16-bit PCM: {wav_path}")
+
+    bounds = _chunk_bounds(total_frames, rate)
+    workers = max(1, min(CONCURRENCY, len(bounds)))
+    # Each chunk starts OVERLAP_S before its window and may listen up to BOUNDARY_MAX_S past
+    # it: it stops early once a result starts beyond the window, so an utterance crossing a
+    # boundary is heard whole by the chunk its start falls in. The last chunk ends the file.
+    overlap_frames = int(OVERLAP_S * rate)
+    boundary_frames = max(overlap_frames, int(BOUNDARY_MAX_S * rate))
+    feed_bounds = [
+        (
+            max(0, own_start - overlap_frames),
+            min(total_frames, own_end + boundary_frames),
+            own_end if own_end < total_frames else None,
+        )
+        for own_start, own_end in bounds
+    ]
+
+    stream_format = speechsdk.audio.AudioStreamFormat(
+        samples_per_second=TARGET_SAMPLE_RATE,
+        bits_per_sample=TARGET_SAMPLE_WIDTH * 8,
+        channels=TARGET_CHANNELS,
+    )
+    # One read-only descriptor is shared by every feeder thread (positional reads only).
+    fd = os.open(wav_path, os.O_RDONLY | _O_BINARY)
+    try:
+        pool = _TranscriberPool(speech_config, stream_format, size=workers, demand=len(bounds))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        _transcribe_single_chunk, fd, start_frame, end_frame, pool, wav, chunk_idx, own_end
+                    )
+                    for chunk_idx, (start_frame, end_frame, own_end) in enumerate(feed_bounds)
+                ]
+                try:
+                    # Futures are in chunk order, so results come back sorted by chunk index.
+                    chunk_results = [future.result() for future in futures]
+                except Exception:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            pool.close()
+    finally:
+        os.close(fd)
+
+    transcription_results = _merge_chunk_results(bounds, chunk_results, rate)
+    accepted_last_end = max(
+        (segment["offset"] + segment["duration"] for segment in transcription_results), default=-1
+    )
+    accepted_last_end_s = accepted_last_end / SCALE_100NS
+
     if not transcription_results:
-        print("[DEBUG] No results captured. Consider checking local speech container logs.")
+        _debug("No results captured. Consider checking local speech container logs.")
     elif accepted_last_end_s > 0 and wav_duration > 0 and accepted_last_end_s < wav_duration * 0.98:
-        print(
-            f"[DEBUG] WARNING: transcript may end early "
+        _debug(
+            f"WARNING: transcript may end early "
             f"({accepted_last_end_s:.2f}s vs WAV {wav_duration:.2f}s)."
         )
 
-    return transcription_results
\ No newline at end of file
+    return transcription_results
@@ -1,45 +1,196 @@
 import os
+import re
 import json
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-def clean_segments_with_openai(segments: list[dict], engine: str = "gpt4o") -> list[dict]:
-    """
-    Cleans transcribed segments using the selected engine.
-    Builds a prompt with all segments and instructs the model to return a JSON array with a 'text' key.
-    """
-    user_content = (
-        "Please clean the following transcribed segments. For each segment, remove extraneous characters, "
-        "correct grammatical, punctuation, and spelling errors while preserving the original meaning. "
-        "Do NOT censor or mask any words. Return the result as a JSON array of objects, each with a single key 'text'.\n\n"
+from modules.cache_utils import get_cache_dir
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser gives the same result, only slower.
+    _json_loads = json.loads
+
+# Concurrent cleaning requests; kept at 10 to stay under Azure OpenAI TPM limits.
+CLEAN_MAX_WORKERS = int(os.getenv("CLEAN_MAX_WORKERS", "10"))
+CLEAN_MAX_ATTEMPTS = int(os.getenv("CLEAN_MAX_ATTEMPTS", "3"))
+# Segments packed into one request; the system prompt is sent once per batch.
+CLEAN_BATCH_SIZE = int(os.getenv("CLEAN_BATCH_SIZE", "50"))
+# Upper bound for the per-request output budget, which is otherwise sized from the input.
+CLEAN_MAX_OUTPUT_TOKENS = int(os.getenv("CLEAN_MAX_OUTPUT_TOKENS", "8192"))
+# Cleaned texts kept in memory; the SQLite file under the cache dir keeps all of them.
+CLEAN_CACHE_MAX_ENTRIES = int(os.getenv("CLEAN_CACHE_MAX_ENTRIES", "4096"))
+# "lines": one cleaned segment per output line (far fewer output tokens than JSON framing).
+# "json": the original {"segments": [{"id", "text"}]} object, kept as a fallback.
+CLEAN_OUTPUT_FORMAT = os.getenv("CLEAN_OUTPUT_FORMAT", "lines").strip().lower()
+
+SYSTEM_MESSAGE = "You are an AI assistant that cleans and formats transcribed text."
+
+_CLEAN_INSTRUCTIONS = (
+    "Please clean the following transcribed segments. For each segment, remove extraneous characters, "
+    "correct grammatical, punctuation, and spelling errors while preserving the original meaning. "
+    "Do NOT censor or mask any words. "
+)
+_LINES_PROMPT = _CLEAN_INSTRUCTIONS + (
+    "The segments are given one per line. "
+    "Return each cleaned segment on its own line, in the same order, with no numbering, quoting "
+    "or any other text, and exactly one line per input segment.\n\n"
+)
+_JSON_PROMPT = _CLEAN_INSTRUCTIONS + (
+    "The segments are given as a JSON array of objects with 'id' and 'text'. "
+    "Return a JSON object of the form {\"segments\": [{\"id\": <id>, \"text\": <cleaned text>}, ...]} "
+    "with exactly one entry per input segment, keeping the same ids and order.\n\n"
+)
+
+# A response wrapped in a markdown code block; the closing fence may be missing.
+_FENCE_RE = re.compile(r"^```[^\n]*\n(.*?)(?:\n?```)?\s*$", re.S)
+
+
+_clean_cache: dict[bytes, str] = {}
+_clean_cache_lock = threading.Lock()
+
+
+def _clean_cache_key(engine: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{engine}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+def _open_clean_cache_db() -> Optional[sqlite3.Connection]:
+    try:
+        conn = sqlite3.connect(get_cache_dir() / "clean_cache.sqlite", timeout=5)
+        conn.execute("CREATE TABLE IF NOT EXISTS cleaned (key BLOB PRIMARY KEY, text TEXT NOT NULL)")
+        return conn
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def _remember_cleaned(entries: dict[bytes, str]) -> None:
+    with _clean_cache_lock:
+        _clean_cache.update(entries)
+        # Dicts keep insertion order, so this evicts the oldest entries first.
+        while len(_clean_cache) > max(0, CLEAN_CACHE_MAX_ENTRIES):
+            del _clean_cache[next(iter(_clean_cache))]
+
+
+def _load_cleaned(keys: list[bytes]) -> dict[bytes, str]:
+    """Looks the keys up in memory, then on disk; returns only the hits."""
+    with _clean_cache_lock:
+        found = {key: _clean_cache[key] for key in keys if key in _clean_cache}
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return found
+
+    conn = _open_clean_cache_db()
+    if conn is None:
+        return found
+    from_disk = {}
+    try:
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(missing), 500):
+            part = missing[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, text FROM cleaned WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            from_disk.update((bytes(key), text) for key, text in rows)
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
+
+    _remember_cleaned(from_disk)
+    found.update(from_disk)
+    return found
+
+
+def _store_cleaned(entries: dict[bytes, str]) -> None:
+    if not entries:
+        return
+    _remember_cleaned(entries)
+    conn = _open_clean_cache_db()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO cleaned (key, text) VALUES (?, ?)", entries.items())
+    except sqlite3.Error:
+        # The cache is an optimization only; never fail a cleaning because of it.
+        pass
+    finally:
+        conn.close()
+
+
+def _build_user_content(segments: list[dict]) -> str:
+    # Each request is one prefix plus one join over the batch, so building it stays linear.
+    if CLEAN_OUTPUT_FORMAT != "json":
+        # Segments must stay on a single line each for the line-by-line answer to line up.
+        return _LINES_PROMPT + "\n".join(" ".join(seg.get("text", "").split()) for seg in segments)
+
+    return _JSON_PROMPT + json.dumps(
+        [{"id": i, "text": seg.get("text", "")} for i, seg in enumerate(segments)],
+        ensure_ascii=False
     )
-    for i, seg in enumerate(segments, start=1):
-        user_content += f"Segment {i}: {seg.get('text', '')}\n---\n"
 
-    system_message = "You are an AI assistant that cleans and formats transcribed text."
 
+def _max_output_tokens(user_content: str) -> int:
+    """About 1.2x the input tokens, estimated conservatively at 3 characters per token."""
+    estimate = int(len(user_content) / 3 * 1.2) + 64
+    return max(256, min(CLEAN_MAX_OUTPUT_TOKENS, estimate))
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """True for throttling (429) and server-side (5xx) errors from either SDK."""
+    status = getattr(exc, "http_status", None) or getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _with_backoff(call):
+    backoff_s = 1.0
+    for attempt in range(1, CLEAN_MAX_ATTEMPTS + 1):
+        try:
+            return call()
+        except Exception as exc:
+            if attempt == CLEAN_MAX_ATTEMPTS or not _is_retryable(exc):
+                raise
+            time.sleep(backoff_s)
+            backoff_s = min(30.0, backoff_s * 2.0)
+
+
+def _make_completer(engine: str):
+    """
+    Configures the selected engine once and returns a callable that sends a single
+    user message and returns the raw model output. The callable is shared by all workers.
+    """
     if engine == "gpt4o":
-        import openai
-        # Configure Azure OpenAI settings
-        openai.api_type = "azure"
-        openai.api_base = os.getenv("OPENAI_ENDPOINT")  # e.g., https://empowergovswcent.openai.azure.com/
-        openai.api_version = "2025-01-01-preview"  # Adjust if necessary
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        deployment = os.getenv("DEPLOYMENT_NAME", "gpt-4o")
-        prompt = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_content}
-        ]
-        response = openai.ChatCompletion.create(
-            engine=deployment,
-            messages=prompt,
-            max_tokens=3000,
-            temperature=0.5,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0
-        )
-        cleaned_text_json = response.choices[0].message["content"]
+        from modules.openai_analysis import _azure_openai_settings, _get_azure_client
+        # Same endpoint/deployment settings and pooled client as the analysis step
+        endpoint, api_key, deployment, api_version = _azure_openai_settings()
+        client = _get_azure_client(endpoint, api_version, api_key)
+        json_mode = {"response_format": {"type": "json_object"}} if CLEAN_OUTPUT_FORMAT == "json" else {}
 
-    elif engine == "phi4":
+        def complete(user_content: str) -> str:
+            prompt = [
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": user_content}
+            ]
+            response = client.chat.completions.create(
+                model=deployment,
+                messages=prompt,
+                max_tokens=_max_output_tokens(user_content),
+                temperature=0.5,
+                top_p=0.95,
+                frequency_penalty=0,
+                presence_penalty=0,
+                **json_mode
+            )
+            return response.choices[0].message.content or ""
+
+        return complete
+
+    if engine == "phi4":
         from azure.ai.inference import ChatCompletionsClient
         from azure.core.credentials import AzureKeyCredential
         phi4_endpoint = os.getenv("PHI4_ENDPOINT")
@@ -53,40 +204,127 @@ def clean_segments_with_openai(segments: list[dict], engine: str = "gpt4o") -> l
             endpoint=phi4_endpoint,
             credential=AzureKeyCredential(phi4_key)
         )
-        payload = {
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_content}
-            ],
-            "max_tokens": 3000,
-            "temperature": 0.5,
-            "top_p": 0.95,
-            "presence_penalty": 0,
-            "frequency_penalty": 0
-        }
-        response = client.complete(payload)
-        cleaned_text_json = response.choices[0].message.content
-    else:
-        raise Exception("Unsupported engine specified. Use 'gpt4o' or 'phi4'.")
 
+        def complete(user_content: str) -> str:
+            payload = {
+                "messages": [
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": user_content}
+                ],
+                "max_tokens": _max_output_tokens(user_content),
+                "temperature": 0.5,
+                "top_p": 0.95,
+                "presence_penalty": 0,
+                "frequency_penalty": 0
+            }
+            response = client.complete(payload)
+            return response.choices[0].message.content
+
+        return complete
+
+    raise Exception("Unsupported engine specified. Use 'gpt4o' or 'phi4'.")
+
+
+def _parse_cleaned(cleaned_text_json: str, batch: list[dict]):
+    """Returns the cleaned texts in batch order, or None if the response is unusable."""
     # Remove markdown code block formatting if present.
-    if cleaned_text_json.startswith("```"):
-        lines = cleaned_text_json.splitlines()
-        if lines and lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].startswith("```"):
-            lines = lines[:-1]
-        cleaned_text_json = "\n".join(lines)
+    match = _FENCE_RE.match(cleaned_text_json)
+    if match:
+        cleaned_text_json = match.group(1)
+
+    if CLEAN_OUTPUT_FORMAT != "json":
+        lines = [line.strip() for line in cleaned_text_json.splitlines() if line.strip()]
+        if len(lines) != len(batch):
+            print("Warning: Returned lines do not match the segment count.")
+            return None
+        return lines
 
     try:
-        cleaned_array = json.loads(cleaned_text_json)
-        if isinstance(cleaned_array, list) and len(cleaned_array) == len(segments):
-            for i, seg in enumerate(segments):
-                seg["text"] = cleaned_array[i].get("text", seg.get("text", ""))
-        else:
-            print("Warning: Returned JSON does not match expected format or segment count.")
-    except Exception as e:
+        parsed = _json_loads(cleaned_text_json)
+    except ValueError as e:
         print("Error parsing JSON from cleaning API:", e)
         print("Raw response for debugging:", cleaned_text_json)
+        return None
+
+    items = parsed.get("segments") if isinstance(parsed, dict) else parsed
+    by_id = {}
+    if isinstance(items, list):
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and isinstance(item.get("text"), str):
+                try:
+                    by_id[int(item.get("id", position))] = item["text"]
+                except (TypeError, ValueError):
+                    pass
+
+    if len(by_id) != len(batch) or any(i not in by_id for i in range(len(batch))):
+        print("Warning: Returned JSON does not match expected format or segment count.")
+        return None
+    return [by_id[i] for i in range(len(batch))]
+
+
+def _clean_batch(complete, batch: list[dict]) -> list[bool]:
+    """
+    Cleans one batch of segments in place. If the response cannot be matched to the
+    batch, each segment is retried on its own; a single segment that still fails keeps
+    its original text. Returns, per segment, whether it was actually cleaned.
+    """
+    cleaned_text_json = _with_backoff(lambda: complete(_build_user_content(batch)))
+    cleaned_texts = _parse_cleaned(cleaned_text_json, batch)
+
+    if cleaned_texts is None:
+        if len(batch) > 1:
+            return [ok for seg in batch for ok in _clean_batch(complete, [seg])]
+        return [False]
+
+    for seg, cleaned_text in zip(batch, cleaned_texts):
+        seg["text"] = cleaned_text
+    return [True] * len(batch)
+
+
+def clean_segments_with_openai(segments: list[dict], engine: str = "gpt4o") -> list[dict]:
+    """
+    Cleans transcribed segments using the selected engine.
+    Texts already cleaned by the same engine (in this or an earlier run) are served from
+    the clean cache, and repeated texts in the input are sent only once.
+    The remaining segments are packed CLEAN_BATCH_SIZE per request and the batches are
+    sent up to CLEAN_MAX_WORKERS at a time, so the total latency tracks the slowest
+    request instead of the sum of all of them.
+    Throttled (429) and 5xx responses are retried with exponential backoff.
+    """
+    if not segments:
+        return segments
+
+    keys = [_clean_cache_key(engine, seg.get("text", "")) for seg in segments]
+    cached = _load_cleaned(keys)
+
+    # Segments still to clean, grouped by text so each distinct text is sent once.
+    pending: dict[bytes, list[dict]] = {}
+    for seg, key in zip(segments, keys):
+        if not seg.get("text", "").strip():
+            continue  # Nothing to clean.
+        if key in cached:
+            seg["text"] = cached[key]
+        else:
+            pending.setdefault(key, []).append(seg)
+    if not pending:
+        return segments
+
+    unique = [{"text": group[0].get("text", "")} for group in pending.values()]
+    complete = _make_completer(engine)
+    batch_size = max(1, CLEAN_BATCH_SIZE)
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    with ThreadPoolExecutor(max_workers=min(CLEAN_MAX_WORKERS, len(batches))) as executor:
+        # Consume the iterator so request errors propagate to the caller.
+        results = executor.map(lambda batch: _clean_batch(complete, batch), batches)
+        cleaned_flags = [ok for flags in results for ok in flags]
+
+    # Only texts that were really cleaned are cached, so failures are retried next time.
+    new_entries = {}
+    for (key, group), item, cleaned in zip(pending.items(), unique, cleaned_flags):
+        for seg in group:
+            seg["text"] = item["text"]
+        if cleaned:
+            new_entries[key] = item["text"]
+    _store_cleaned(new_entries)
 
     return segments
@@ -1,13 +1,61 @@
 import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, repeat
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib codec.
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    _json_loads = json.loads
+
+# Payloads larger than this are split into shards translated concurrently.
+TRANSLATE_SHARD_SIZE = int(os.getenv("TRANSLATE_SHARD_SIZE", "25"))
+TRANSLATE_MAX_WORKERS = int(os.getenv("TRANSLATE_MAX_WORKERS", "4"))
+
+
+def _create_session() -> requests.Session:
+    """
+    Session shared by every translate call, so keep-alive connections to the translator
+    are reused instead of paying a new TCP handshake per request. 429/503 responses
+    are retried with exponential backoff by the adapter.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_TRANSLATOR_SESSION = _create_session()
+# Long-lived workers for sharded requests, so a translate call does not spawn threads.
+_TRANSLATOR_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, TRANSLATE_MAX_WORKERS), thread_name_prefix="translator"
+)
 
 def translate_transcription_segments(segments: list[dict], target_language: str, source_language: str = None) -> list[dict]:
     """
     Translates the text of each transcription segment using the Azure Translator container.
     
     The function preserves the diarization segmentation by processing a list of segments.
-    It sends a batch translation request to the translator endpoint and adds a new key 'translated_text'
-    to each segment with the translated output.
+    It sends batch translation requests to the translator endpoint over a pooled keep-alive session,
+    splitting payloads larger than TRANSLATE_SHARD_SIZE into shards sent concurrently, and adds a
+    new key 'translated_text' to each segment with the translated output.
     
     Parameters:
       - segments (list[dict]): List of transcription segments. Each segment should have a 'text' key.
@@ -29,9 +77,10 @@ def translate_transcription_segments(segments: list[dict], target_language: str,
     
     # Build the URL for text translation.
     # Using the Translator Text API v3.0 format.
-    url = f"{endpoint}/translate?api-version=3.0&to={target_language}"
+    query = ["api-version=3.0", f"to={target_language}"]
     if source_language and source_language.lower() not in ["auto", "auto-detect"]:
-        url += f"&from={source_language}"
+        query.append(f"from={source_language}")
+    url = f"{endpoint}/translate?{'&'.join(query)}"
     
     # Build the payload as a list of objects, each containing the "Text" field.
     payload = [{"Text": seg.get("text", "")} for seg in segments]
@@ -41,26 +90,34 @@ def translate_transcription_segments(segments: list[dict], target_language: str,
         "Ocp-Apim-Subscription-Key": translator_key
     }
     
-    # Send the POST request to the translation endpoint.
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()
+    def post(shard: list[dict]) -> list:
+        # Send the POST request to the translation endpoint. The body is encoded up front,
+        # so it goes out as one buffer with a known Content-Length.
+        response = _TRANSLATOR_SESSION.post(url, headers=headers, data=_json_dumps(shard))
+        response.raise_for_status()
+        # Parse the JSON response straight from the raw body.
+        # The expected format is a list where each element corresponds to an input text:
+        # [{
+        #    "translations": [{
+        #         "text": "translated text",
+        #         "to": "target_language"
+        #     }]
+        # }, ...]
+        return _json_loads(response.content)
     
-    # Parse the JSON response.
-    # The expected format is a list where each element corresponds to an input text:
-    # [{
-    #    "translations": [{
-    #         "text": "translated text",
-    #         "to": "target_language"
-    #     }]
-    # }, ...]
-    translations = response.json()
+    # Large payloads are sharded and translated concurrently; results are zipped back in order.
+    shard_size = max(1, TRANSLATE_SHARD_SIZE)
+    shards = [payload[i:i + shard_size] for i in range(0, len(payload), shard_size)]
+    if len(shards) <= 1:
+        translations = post(payload)
+    else:
+        translations = [item for shard_result in _TRANSLATOR_EXECUTOR.map(post, shards) for item in shard_result]
     
     # Update each segment with the translated text.
-    for i, seg in enumerate(segments):
-        try:
-            translated_text = translations[i]["translations"][0]["text"]
-        except (IndexError, KeyError):
-            translated_text = ""
+    # Extract every translated text in one pass, then zip them onto the segments; segments
+    # beyond the end of the response get an empty string.
+    translated_texts = [(item.get("translations") or [{}])[0].get("text", "") for item in translations]
+    for seg, translated_text in zip(segments, chain(translated_texts, repeat(""))):
         seg["translated_text"] = translated_text
     
     return segments